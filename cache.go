@@ -29,6 +29,8 @@ type Cache struct {
 	root     string
 	db       *gorm.DB
 	paperLRU *LRUCache
+
+	embeddingIndex embeddingIndexCache
 }
 
 // Open opens or creates an arXiv cache at the given root directory.
@@ -81,8 +83,8 @@ func (c *Cache) Root() string {
 }
 
 func (c *Cache) initSchema() error {
-	// GORM AutoMigrate handles all regular tables (Paper, Citation, SyncState, DownloadQueueItem, Embedding)
-	if err := c.db.AutoMigrate(&Paper{}, &Citation{}, &SyncState{}, &DownloadQueueItem{}, &Embedding{}); err != nil {
+	// GORM AutoMigrate handles all regular tables (Paper, Citation, SyncState, DownloadQueueItem, Embedding, EmbeddingMeta)
+	if err := c.db.AutoMigrate(&Paper{}, &Citation{}, &SyncState{}, &DownloadQueueItem{}, &Embedding{}, &EmbeddingMeta{}); err != nil {
 		return fmt.Errorf("auto migrate: %w", err)
 	}
 
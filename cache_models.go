@@ -102,8 +102,25 @@ type Embedding struct {
 	Model   string    `gorm:"column:model"`
 	Vector  []byte    `gorm:"type:blob;column:vector"`
 	Created time.Time `gorm:"column:created"`
+
+	// Precision is the storage format of Vector: "float32", "int8" or "binary".
+	Precision string `gorm:"column:precision;default:float32"`
 }
 
 func (Embedding) TableName() string {
 	return "embeddings"
 }
+
+// EmbeddingMeta stores per-model parameters needed to decode quantized vectors.
+// Generation is bumped by every write to the model's embeddings, so the
+// on-disk search index can tell when it is stale.
+type EmbeddingMeta struct {
+	Model      string  `gorm:"primaryKey;column:model"`
+	Scale      float64 `gorm:"column:scale"`
+	Dim        int     `gorm:"column:dim"`
+	Generation int64   `gorm:"column:generation;default:0"`
+}
+
+func (EmbeddingMeta) TableName() string {
+	return "embedding_meta"
+}
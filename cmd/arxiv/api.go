@@ -2,6 +2,7 @@ package main
 
 import (
 	"bufio"
+	"context"
 	"encoding/json"
 	"fmt"
 	"net/http"
@@ -162,7 +163,7 @@ func (s *server) handleAPISearchSemantic(w http.ResponseWriter, r *http.Request)
 	}
 
 	// Generate query embedding using Python script
-	queryEmbedding, err := s.generateQueryEmbedding(query)
+	queryEmbedding, err := s.generateQueryEmbedding(ctx, query)
 	if err != nil {
 		respondJSON(w, http.StatusServiceUnavailable, APIResponse{
 			Success: false,
@@ -301,7 +302,7 @@ func (s *server) handleAPISearchStream(w http.ResponseWriter, r *http.Request) {
 		}))
 		flusher.Flush()
 
-		queryEmbedding, err := s.generateQueryEmbedding(query)
+		queryEmbedding, err := s.generateQueryEmbedding(ctx, query)
 		if err != nil {
 			fmt.Fprintf(w, "data: %s\n\n", toJSON(map[string]interface{}{
 				"type":  "error",
@@ -970,36 +971,8 @@ func toJSON(data interface{}) string {
 	return string(jsonBytes)
 }
 
-func (s *server) generateQueryEmbedding(query string) ([]float32, error) {
-	cmd := exec.Command("python3", getToolsPath("generate_embeddings.py"), s.cache.Root(), "--query", query)
-
-	output, err := cmd.CombinedOutput()
-	if err != nil {
-		return nil, fmt.Errorf("python embedding failed: %v, output: %s", err, string(output))
-	}
-
-	outputStr := strings.TrimSpace(string(output))
-	if outputStr == "" {
-		return nil, fmt.Errorf("empty output from python embedding")
-	}
-
-	if strings.HasPrefix(outputStr, "ERROR:") {
-		return nil, fmt.Errorf("embedding script error: %s", outputStr)
-	}
-
-	// Parse comma-separated float values
-	parts := strings.Split(outputStr, ",")
-	embedding := make([]float32, len(parts))
-
-	for i, part := range parts {
-		val, err := strconv.ParseFloat(strings.TrimSpace(part), 32)
-		if err != nil {
-			return nil, fmt.Errorf("failed to parse embedding value %q: %v", part, err)
-		}
-		embedding[i] = float32(val)
-	}
-
-	return embedding, nil
+func (s *server) generateQueryEmbedding(ctx context.Context, query string) ([]float32, error) {
+	return s.embedder.Embed(ctx, query)
 }
 
 // respondJSON sends a JSON response
@@ -0,0 +1,222 @@
+package main
+
+import (
+	"bufio"
+	"context"
+	"encoding/base64"
+	"encoding/binary"
+	"errors"
+	"fmt"
+	"io"
+	"math"
+	"os/exec"
+	"strings"
+	"sync"
+	"time"
+)
+
+// queryEmbedder keeps a single query_embedding.py worker running so the
+// sentence-transformers model is loaded once rather than on every search.
+// Queries are written to the worker's stdin one per line and each answer is
+// read back as one line on stdout: base64 of the little-endian float32 vector.
+// The worker caches embeddings under cacheDir, so repeated queries skip the model.
+type queryEmbedder struct {
+	cacheDir string
+
+	// sem is held while using the worker. It is a channel rather than a
+	// mutex so callers waiting behind a slow query can give up.
+	sem    chan struct{}
+	cmd    *exec.Cmd
+	stdin  io.WriteCloser
+	stdout *bufio.Reader
+	stderr *tailBuffer
+
+	// dim is the length of the first embedding received; later replies
+	// of any other length mean the protocol is out of step.
+	dim int
+}
+
+// embedTimeout bounds one query to the worker, including starting it and
+// loading the model. A worker that misses it is killed and restarted.
+const embedTimeout = 2 * time.Minute
+
+// workerStderrLimit bounds how much of the worker's stderr is kept for error messages.
+const workerStderrLimit = 4096
+
+// tailBuffer is an io.Writer that keeps only the last limit bytes written to it.
+type tailBuffer struct {
+	mu    sync.Mutex
+	limit int
+	buf   []byte
+}
+
+func (t *tailBuffer) Write(p []byte) (int, error) {
+	t.mu.Lock()
+	defer t.mu.Unlock()
+	t.buf = append(t.buf, p...)
+	if len(t.buf) > t.limit {
+		t.buf = append(t.buf[:0], t.buf[len(t.buf)-t.limit:]...)
+	}
+	return len(p), nil
+}
+
+func (t *tailBuffer) String() string {
+	t.mu.Lock()
+	defer t.mu.Unlock()
+	return strings.TrimSpace(string(t.buf))
+}
+
+func newQueryEmbedder(cacheDir string) *queryEmbedder {
+	return &queryEmbedder{cacheDir: cacheDir, sem: make(chan struct{}, 1)}
+}
+
+// start launches the worker process. Callers must hold e.sem.
+func (e *queryEmbedder) start() error {
+	cmd := exec.Command("python3", getToolsPath("query_embedding.py"), "--server", "--cache-dir", e.cacheDir)
+	stdin, err := cmd.StdinPipe()
+	if err != nil {
+		return err
+	}
+	stdout, err := cmd.StdoutPipe()
+	if err != nil {
+		return err
+	}
+	stderr := &tailBuffer{limit: workerStderrLimit}
+	cmd.Stderr = stderr
+	if err := cmd.Start(); err != nil {
+		return fmt.Errorf("start embedding worker: %w", err)
+	}
+	e.cmd = cmd
+	e.stdin = stdin
+	e.stdout = bufio.NewReaderSize(stdout, 64*1024)
+	e.stderr = stderr
+	return nil
+}
+
+// fail stops the worker and returns err annotated with the tail of its
+// stderr, so a worker that dies at startup reports why. Callers must hold e.sem.
+func (e *queryEmbedder) fail(msg string, err error) error {
+	stderr := e.stderr
+	e.stop()
+	if tail := stderr.String(); tail != "" {
+		return fmt.Errorf("%s: %w: %s", msg, err, tail)
+	}
+	return fmt.Errorf("%s: %w", msg, err)
+}
+
+// stop terminates the worker process. Callers must hold e.sem.
+func (e *queryEmbedder) stop() {
+	if e.cmd == nil {
+		return
+	}
+	e.stdin.Close()
+	e.cmd.Process.Kill()
+	e.cmd.Wait()
+	e.cmd = nil
+	e.stdin = nil
+	e.stdout = nil
+	e.stderr = nil
+}
+
+// Embed returns the embedding for query, starting the worker if needed.
+// If the worker dies, misbehaves or misses ctx's deadline (at most
+// embedTimeout) it is stopped and restarted on the next call.
+func (e *queryEmbedder) Embed(ctx context.Context, query string) ([]float32, error) {
+	query = strings.Join(strings.Fields(query), " ")
+	if query == "" {
+		return nil, fmt.Errorf("empty query")
+	}
+
+	ctx, cancel := context.WithTimeout(ctx, embedTimeout)
+	defer cancel()
+
+	select {
+	case e.sem <- struct{}{}:
+	case <-ctx.Done():
+		return nil, fmt.Errorf("wait for embedding worker: %w", ctx.Err())
+	}
+	defer func() { <-e.sem }()
+
+	if e.cmd == nil {
+		if err := e.start(); err != nil {
+			return nil, err
+		}
+	}
+
+	if _, err := io.WriteString(e.stdin, query+"\n"); err != nil {
+		return nil, e.fail("write to embedding worker", err)
+	}
+
+	line, err := e.readLine(ctx)
+	if err != nil {
+		return nil, e.fail("read from embedding worker", err)
+	}
+
+	// Any unexpected reply may leave unread output behind, which would be
+	// taken as the answer to the next query, so restart the worker
+	line = strings.TrimSpace(line)
+	if strings.HasPrefix(line, "ERROR:") {
+		return nil, e.fail("embedding script error", errors.New(line))
+	}
+	embedding, err := parseEmbedding(line)
+	if err != nil {
+		return nil, e.fail("bad reply from embedding worker", err)
+	}
+	if e.dim == 0 {
+		e.dim = len(embedding)
+	} else if len(embedding) != e.dim {
+		return nil, e.fail("bad reply from embedding worker", fmt.Errorf("embedding has %d dimensions, want %d", len(embedding), e.dim))
+	}
+	return embedding, nil
+}
+
+// readLine reads one reply from the worker, giving up when ctx is done.
+// On error the caller must stop the worker, which also ends the read.
+// Callers must hold e.sem.
+func (e *queryEmbedder) readLine(ctx context.Context) (string, error) {
+	type reply struct {
+		line string
+		err  error
+	}
+	replies := make(chan reply, 1)
+	stdout := e.stdout
+	go func() {
+		line, err := stdout.ReadString('\n')
+		replies <- reply{line, err}
+	}()
+
+	select {
+	case r := <-replies:
+		return r.line, r.err
+	case <-ctx.Done():
+		return "", ctx.Err()
+	}
+}
+
+// Close stops the worker process.
+func (e *queryEmbedder) Close() {
+	e.sem <- struct{}{}
+	defer func() { <-e.sem }()
+	e.stop()
+}
+
+// parseEmbedding decodes a base64-encoded little-endian float32 vector.
+func parseEmbedding(s string) ([]float32, error) {
+	if s == "" {
+		return nil, fmt.Errorf("empty output from python embedding")
+	}
+
+	data, err := base64.StdEncoding.DecodeString(s)
+	if err != nil {
+		return nil, fmt.Errorf("failed to decode embedding: %v", err)
+	}
+	if len(data)%4 != 0 {
+		return nil, fmt.Errorf("embedding has %d bytes, not a multiple of 4", len(data))
+	}
+
+	embedding := make([]float32, len(data)/4)
+	for i := range embedding {
+		embedding[i] = math.Float32frombits(binary.LittleEndian.Uint32(data[i*4:]))
+	}
+	return embedding, nil
+}
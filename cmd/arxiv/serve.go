@@ -63,7 +63,7 @@ func cmdServe(ctx context.Context, cacheDir string, args []string) {
 		log.Fatalf("open cache: %v", err)
 	}
 
-	srv := &server{cache: cache, cacheDir: cacheDir}
+	srv := &server{cache: cache, cacheDir: cacheDir, embedder: newQueryEmbedder(cache.Root())}
 	mux := http.NewServeMux()
 
 	// API routes (before other routes for proper matching)
@@ -111,6 +111,7 @@ func cmdServe(ctx context.Context, cacheDir string, args []string) {
 	go func() {
 		<-ctx.Done()
 		httpServer.Shutdown(context.Background())
+		srv.embedder.Close()
 	}()
 
 	if err := httpServer.ListenAndServe(); err != http.ErrServerClosed {
@@ -121,6 +122,7 @@ func cmdServe(ctx context.Context, cacheDir string, args []string) {
 type server struct {
 	cache    *arxiv.Cache
 	cacheDir string
+	embedder *queryEmbedder
 }
 
 // sitemapURLs collects the public, crawlable URLs for the sitemap.
@@ -323,7 +325,7 @@ func (s *server) handleSearch(w http.ResponseWriter, r *http.Request) {
 			return
 		}
 
-		queryEmbedding, err := s.generateQueryEmbedding(query)
+		queryEmbedding, err := s.generateQueryEmbedding(ctx, query)
 		if err != nil {
 			http.Error(w, "Failed to generate query embedding: "+err.Error(), http.StatusServiceUnavailable)
 			return
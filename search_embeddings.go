@@ -2,10 +2,28 @@ package arxiv
 
 import (
 	"context"
+	"encoding/binary"
+	"encoding/json"
+	"fmt"
 	"math"
+	"os"
+	"path/filepath"
+	"runtime"
 	"sort"
+	"strings"
+	"sync"
+	"time"
+	"unsafe"
 
 	"github.com/viterin/vek"
+	"github.com/viterin/vek/vek32"
+)
+
+// Files written to the cache root by tools/build_index.py.
+const (
+	embeddingIndexFile     = "embeddings.f32"
+	embeddingIndexIDsFile  = "paper_ids.txt"
+	embeddingIndexMetaFile = "embeddings.json"
 )
 
 type SemanticResult struct {
@@ -19,6 +37,46 @@ func (c *Cache) SearchSemantic(ctx context.Context, queryEmbedding []float32, li
 		limit = 20
 	}
 
+	results, ok := c.searchEmbeddingIndex(ctx, queryEmbedding)
+	if !ok {
+		var err error
+		results, err = c.searchEmbeddingTable(ctx, queryEmbedding)
+		if err != nil {
+			return nil, err
+		}
+	}
+
+	if len(results) == 0 {
+		return []SemanticResult{}, nil
+	}
+
+	sort.Slice(results, func(i, j int) bool {
+		return results[i].Similarity > results[j].Similarity
+	})
+
+	if len(results) > limit {
+		results = results[:limit]
+	}
+
+	papers, err := c.GetPapersByIDs(ctx, getPaperIDs(results))
+	if err == nil {
+		paperMap := make(map[string]*Paper)
+		for _, paper := range papers {
+			paperMap[paper.ID] = &paper
+		}
+
+		for i := range results {
+			if paper, exists := paperMap[results[i].PaperID]; exists {
+				results[i].Paper = paper
+			}
+		}
+	}
+
+	return results, nil
+}
+
+// searchEmbeddingTable scores every row of the embeddings table.
+func (c *Cache) searchEmbeddingTable(ctx context.Context, queryEmbedding []float32) ([]SemanticResult, error) {
 	var embeddings []Embedding
 	err := c.db.WithContext(ctx).Find(&embeddings).Error
 	if err != nil {
@@ -26,13 +84,18 @@ func (c *Cache) SearchSemantic(ctx context.Context, queryEmbedding []float32, li
 	}
 
 	if len(embeddings) == 0 {
-		return []SemanticResult{}, nil
+		return nil, nil
+	}
+
+	scales, err := c.embeddingScales(ctx)
+	if err != nil {
+		return nil, err
 	}
 
 	results := make([]SemanticResult, 0, len(embeddings))
 
 	for _, emb := range embeddings {
-		vector := bytesToFloat32Slice(emb.Vector)
+		vector := decodeEmbedding(emb, scales)
 		if len(vector) != len(queryEmbedding) {
 			continue
 		}
@@ -46,29 +109,153 @@ func (c *Cache) SearchSemantic(ctx context.Context, queryEmbedding []float32, li
 		}
 	}
 
-	sort.Slice(results, func(i, j int) bool {
-		return results[i].Similarity > results[j].Similarity
-	})
+	return results, nil
+}
 
-	if len(results) > limit {
-		results = results[:limit]
+// embeddingIndex is a snapshot of the embeddings table written by
+// tools/build_index.py: one unit-norm float32 row per paper, stored
+// contiguously so a search is a single pass of dot products. The vectors
+// are memory-mapped and unmapped once the index is no longer referenced.
+type embeddingIndex struct {
+	modTime  time.Time
+	meta     embeddingIndexMeta
+	paperIDs []string
+	vectors  []float32
+}
+
+// embeddingIndexMeta describes an index: which model it holds, its shape,
+// and the embeddings generation (see EmbeddingMeta) it reflects.
+type embeddingIndexMeta struct {
+	Model      string `json:"model"`
+	Dim        int    `json:"dim"`
+	Count      int    `json:"count"`
+	Generation int64  `json:"generation"`
+}
+
+// embeddingIndexCache holds the most recently loaded embeddingIndex.
+type embeddingIndexCache struct {
+	mu    sync.Mutex
+	index *embeddingIndex
+}
+
+// searchEmbeddingIndex scores the query against the on-disk index. It reports
+// false if there is no usable index, including when the index is stale (the
+// model's embeddings generation has moved on) or has a different dimension.
+func (c *Cache) searchEmbeddingIndex(ctx context.Context, queryEmbedding []float32) ([]SemanticResult, bool) {
+	idx, err := c.loadEmbeddingIndex()
+	if err != nil || idx == nil {
+		return nil, false
 	}
+	defer runtime.KeepAlive(idx)
 
-	papers, err := c.GetPapersByIDs(ctx, getPaperIDs(results))
-	if err == nil {
-		paperMap := make(map[string]*Paper)
-		for _, paper := range papers {
-			paperMap[paper.ID] = &paper
-		}
+	dim := len(queryEmbedding)
+	if dim == 0 || dim != idx.meta.Dim {
+		return nil, false
+	}
 
-		for i := range results {
-			if paper, exists := paperMap[results[i].PaperID]; exists {
-				results[i].Paper = paper
-			}
+	generation, err := c.embeddingGeneration(ctx, idx.meta.Model)
+	if err != nil || generation != idx.meta.Generation {
+		return nil, false
+	}
+
+	queryNorm := vek32.Norm(queryEmbedding)
+	if queryNorm == 0 {
+		return nil, false
+	}
+
+	results := make([]SemanticResult, 0, 1024)
+	for i, id := range idx.paperIDs {
+		similarity := float64(vek32.Dot(queryEmbedding, idx.vectors[i*dim:(i+1)*dim]) / queryNorm)
+		if similarity > 0 {
+			results = append(results, SemanticResult{
+				PaperID:    id,
+				Similarity: similarity,
+			})
 		}
 	}
+	return results, true
+}
 
-	return results, nil
+// embeddingGeneration returns the embeddings generation for model, or 0 if
+// the model has no metadata row.
+func (c *Cache) embeddingGeneration(ctx context.Context, model string) (int64, error) {
+	var metas []EmbeddingMeta
+	err := c.db.WithContext(ctx).Where("model = ?", model).Limit(1).Find(&metas).Error
+	if err != nil || len(metas) == 0 {
+		return 0, err
+	}
+	return metas[0].Generation, nil
+}
+
+// loadEmbeddingIndex returns the on-disk index, reloading it when its
+// metadata file has changed. It returns nil if no index has been built.
+func (c *Cache) loadEmbeddingIndex() (*embeddingIndex, error) {
+	metaPath := filepath.Join(c.root, embeddingIndexMetaFile)
+	info, err := os.Stat(metaPath)
+	if os.IsNotExist(err) {
+		return nil, nil
+	}
+	if err != nil {
+		return nil, err
+	}
+
+	c.embeddingIndex.mu.Lock()
+	defer c.embeddingIndex.mu.Unlock()
+
+	if idx := c.embeddingIndex.index; idx != nil && idx.modTime.Equal(info.ModTime()) {
+		return idx, nil
+	}
+
+	metaData, err := os.ReadFile(metaPath)
+	if err != nil {
+		return nil, err
+	}
+	var meta embeddingIndexMeta
+	if err := json.Unmarshal(metaData, &meta); err != nil {
+		return nil, err
+	}
+
+	ids, err := os.ReadFile(filepath.Join(c.root, embeddingIndexIDsFile))
+	if err != nil {
+		return nil, err
+	}
+	paperIDs := strings.Fields(string(ids))
+
+	data, release, err := mapFile(filepath.Join(c.root, embeddingIndexFile))
+	if err != nil {
+		return nil, err
+	}
+	// Files may hold rows past Count from an interrupted update; they are ignored
+	vectors := float32View(data)
+	if len(paperIDs) < meta.Count || len(vectors) < meta.Count*meta.Dim {
+		release()
+		return nil, fmt.Errorf("embedding index is shorter than its metadata")
+	}
+
+	idx := &embeddingIndex{
+		modTime:  info.ModTime(),
+		meta:     meta,
+		paperIDs: paperIDs[:meta.Count],
+		vectors:  vectors[:meta.Count*meta.Dim],
+	}
+	runtime.SetFinalizer(idx, func(*embeddingIndex) { release() })
+	c.embeddingIndex.index = idx
+	return idx, nil
+}
+
+// hostLittleEndian reports whether float32View can reinterpret index bytes in place.
+var hostLittleEndian = binary.NativeEndian.Uint16([]byte{1, 0}) == 1
+
+// float32View returns data, little-endian float32, as a []float32. It
+// shares data's memory where the host byte order and alignment allow.
+func float32View(data []byte) []float32 {
+	if len(data) < 4 {
+		return nil
+	}
+	if !hostLittleEndian || uintptr(unsafe.Pointer(&data[0]))%4 != 0 {
+		return bytesToFloat32Slice(data[:len(data)/4*4])
+	}
+	return unsafe.Slice((*float32)(unsafe.Pointer(&data[0])), len(data)/4)
 }
 
 func cosineSimilarity(a, b []float32) float64 {
@@ -88,6 +275,59 @@ func cosineSimilarity(a, b []float32) float64 {
 	return similarity
 }
 
+// embeddingScales returns the int8 dequantization scale for each model.
+func (c *Cache) embeddingScales(ctx context.Context) (map[string]float64, error) {
+	var metas []EmbeddingMeta
+	if err := c.db.WithContext(ctx).Find(&metas).Error; err != nil {
+		return nil, err
+	}
+	scales := make(map[string]float64, len(metas))
+	for _, m := range metas {
+		scales[m.Model] = m.Scale
+	}
+	return scales, nil
+}
+
+// decodeEmbedding returns the float32 vector for emb according to its precision.
+// It returns nil if the vector cannot be decoded.
+func decodeEmbedding(emb Embedding, scales map[string]float64) []float32 {
+	switch emb.Precision {
+	case "int8":
+		scale := scales[emb.Model]
+		if scale == 0 {
+			return nil
+		}
+		return int8BytesToFloat32Slice(emb.Vector, float32(scale))
+	case "binary":
+		return bitsToSignSlice(emb.Vector)
+	default:
+		return bytesToFloat32Slice(emb.Vector)
+	}
+}
+
+func int8BytesToFloat32Slice(data []byte, scale float32) []float32 {
+	result := make([]float32, len(data))
+	for i, b := range data {
+		result[i] = float32(int8(b)) / scale
+	}
+	return result
+}
+
+// bitsToSignSlice unpacks MSB-first sign bits into +1/-1 values.
+func bitsToSignSlice(data []byte) []float32 {
+	result := make([]float32, len(data)*8)
+	for i, b := range data {
+		for j := 0; j < 8; j++ {
+			if b&(0x80>>j) != 0 {
+				result[i*8+j] = 1
+			} else {
+				result[i*8+j] = -1
+			}
+		}
+	}
+	return result
+}
+
 func bytesToFloat32Slice(data []byte) []float32 {
 	if len(data)%4 != 0 {
 		return nil
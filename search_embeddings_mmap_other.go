@@ -0,0 +1,14 @@
+//go:build !unix
+
+package arxiv
+
+import "os"
+
+// mapFile reads path into memory; platforms without mmap get a plain read.
+func mapFile(path string) ([]byte, func(), error) {
+	data, err := os.ReadFile(path)
+	if err != nil {
+		return nil, nil, err
+	}
+	return data, func() {}, nil
+}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Snapshot the embeddings table into a contiguous float32 matrix on disk.
+
+Writes three files to the cache directory:
+    embeddings.f32  - (N, dim) little-endian float32, one unit-norm row per paper
+    paper_ids.txt   - the N paper ids, one per line, in row order
+    embeddings.json - model, dim, N and the embeddings generation indexed
+
+Every write to a model's embeddings bumps its generation in embedding_meta.
+Semantic search in the Go server uses these files instead of decoding every
+BLOB in SQLite, as long as the indexed generation is still current.
+generate_embeddings.py --paper-id patches single rows in with update_index().
+
+Usage:
+    python3 build_index.py <cache_dir> [--model MODEL]
+
+Example:
+    python3 build_index.py ~/.cache/arxiv
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from embedding_format import MODEL_NAME, deserialize_embedding
+
+INDEX_FILE = "embeddings.f32"
+IDS_FILE = "paper_ids.txt"
+META_FILE = "embeddings.json"
+
+# Rows read from SQLite per fetch
+FETCH_SIZE = 10000
+
+
+def embedding_generation(conn, model_name):
+    """Return the generation of model_name's embeddings (0 if never written)."""
+    row = conn.execute("SELECT generation FROM embedding_meta WHERE model = ?", (model_name,)).fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def _write_meta(cache_path, meta):
+    tmp = cache_path / (META_FILE + ".tmp")
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, cache_path / META_FILE)
+
+
+def read_meta(cache_dir):
+    """Return the index metadata written by build_index, or None."""
+    path = Path(cache_dir) / META_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def build_index(cache_dir, model_name=MODEL_NAME):
+    """Write embeddings for model_name to INDEX_FILE and IDS_FILE; return the row count."""
+    cache_path = Path(cache_dir)
+    conn = sqlite3.connect(str(cache_path / "index.db"))
+
+    # Read before the rows, so a write that lands mid-build leaves the index
+    # marked stale rather than current
+    generation = embedding_generation(conn, model_name)
+    row = conn.execute("SELECT scale FROM embedding_meta WHERE model = ?", (model_name,)).fetchone()
+    scale = row[0] if row and row[0] else None
+
+    cursor = conn.execute(
+        "SELECT paper_id, vector, precision FROM embeddings WHERE model = ?", (model_name,))
+
+    index_tmp = cache_path / (INDEX_FILE + ".tmp")
+    ids_tmp = cache_path / (IDS_FILE + ".tmp")
+    count = 0
+    dim = None
+    with open(index_tmp, "wb") as vectors_out, open(ids_tmp, "w") as ids_out:
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+
+            ids = []
+            vectors = []
+            for paper_id, data, precision in rows:
+                if precision == "int8" and scale is None:
+                    continue
+                vector = deserialize_embedding(data, precision or "float32", scale)
+                if dim is None:
+                    dim = len(vector)
+                if len(vector) != dim:
+                    continue
+                ids.append(paper_id)
+                vectors.append(vector)
+            if not ids:
+                continue
+
+            matrix = np.vstack(vectors).astype('<f4')
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms > 0, norms, 1)
+            vectors_out.write(matrix.tobytes())
+            ids_out.write("\n".join(ids) + "\n")
+            count += len(ids)
+
+    conn.close()
+
+    # Replace the metadata last: the server reloads when it changes
+    os.replace(ids_tmp, cache_path / IDS_FILE)
+    os.replace(index_tmp, cache_path / INDEX_FILE)
+    _write_meta(cache_path, {"model": model_name, "dim": dim or 0, "count": count,
+                             "generation": generation})
+    return count
+
+
+def update_index(cache_dir, model_name, paper_id, vector, generation):
+    """Write one paper's vector into the index after a single-row write.
+
+    generation is the embeddings generation after that write. The index is
+    only patched if it was current just before it (generation - 1);
+    otherwise it is already stale and is left for the next build_index.
+    Returns True if the index was updated.
+    """
+    cache_path = Path(cache_dir)
+    meta = read_meta(cache_dir)
+    if (meta is None or meta["model"] != model_name or meta["generation"] != generation - 1
+            or meta["dim"] != len(vector)):
+        return False
+
+    vector = np.asarray(vector, dtype='<f4')
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+
+    count = meta["count"]
+    paper_ids = (cache_path / IDS_FILE).read_text().split()[:count]
+    try:
+        row = paper_ids.index(paper_id)
+    except ValueError:
+        row = count
+        paper_ids.append(paper_id)
+
+    # Rows past count are never read, so appending in place is safe while
+    # the server has the old index mapped
+    with open(cache_path / INDEX_FILE, "r+b") as f:
+        f.seek(row * vector.nbytes)
+        f.write(vector.tobytes())
+
+    ids_tmp = cache_path / (IDS_FILE + ".tmp")
+    ids_tmp.write_text("\n".join(paper_ids) + "\n")
+    os.replace(ids_tmp, cache_path / IDS_FILE)
+    _write_meta(cache_path, dict(meta, count=len(paper_ids), generation=generation))
+    return True
+
+
+def index_exists(cache_dir):
+    return (Path(cache_dir) / INDEX_FILE).exists()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the contiguous embedding index")
+    parser.add_argument("cache_dir", help="Path to arXiv cache directory")
+    parser.add_argument("--model", default=MODEL_NAME,
+                       help=f"Embedding model to index (default: {MODEL_NAME})")
+    args = parser.parse_args()
+
+    if not (Path(args.cache_dir) / "index.db").exists():
+        print(f"Error: Database not found at {Path(args.cache_dir) / 'index.db'}")
+        sys.exit(1)
+
+    count = build_index(args.cache_dir, args.model)
+    print(f"Done! Indexed {count} embeddings.")
+
+
+if __name__ == "__main__":
+    main()
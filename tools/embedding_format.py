@@ -0,0 +1,61 @@
+"""
+Storage format of embeddings.vector.
+
+Serialization helpers shared by the tools that write and read stored
+embeddings. Only NumPy is needed, so readers such as build_index.py never
+import PyTorch or sentence-transformers.
+"""
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"  # 384 dimensions, fast, good quality
+
+# Storage precisions for embeddings.vector:
+#   float32 - little-endian float32, 4 bytes per dimension
+#   int8    - linearly quantized, 1 byte per dimension; value = q / scale,
+#             with one scale per model stored in embedding_meta
+#   binary  - sign bit per dimension packed MSB-first, 1 bit per dimension;
+#             decodes to +1/-1 and is meant for Hamming-distance retrieval
+PRECISIONS = ("float32", "int8", "binary")
+
+
+def pack_signs(embeddings):
+    """Pack the sign bit of each dimension MSB-first along the last axis."""
+    return np.packbits(embeddings > 0, axis=-1)
+
+
+def serialize_embedding(embedding, precision="float32", scale=None):
+    """Serialize numpy array to bytes in the given precision."""
+    return serialize_batch(embedding[np.newaxis], precision, scale)[0]
+
+
+def serialize_batch(embeddings, precision="float32", scale=None):
+    """Serialize each row of a 2-D array to bytes in the given precision.
+
+    The whole batch is converted and copied out as one contiguous buffer,
+    then sliced per row, instead of converting row by row.
+    """
+    if precision == "binary":
+        packed = pack_signs(embeddings)
+    elif precision == "int8":
+        packed = np.clip(np.round(embeddings * scale), -127, 127).astype(np.int8)
+    else:
+        packed = np.ascontiguousarray(embeddings, dtype=np.float32)
+    buf = packed.tobytes()
+    stride = packed.shape[1] * packed.itemsize
+    return [buf[i*stride:(i+1)*stride] for i in range(packed.shape[0])]
+
+
+def deserialize_embedding(data, precision="float32", scale=None):
+    """Deserialize bytes to numpy array."""
+    if precision == "binary":
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).astype(np.float32) * 2 - 1
+    if precision == "int8":
+        return np.frombuffer(data, dtype=np.int8).astype(np.float32) / scale
+    return np.frombuffer(data, dtype='float32')
+
+
+def calibrate_scale(embeddings):
+    """Return the int8 scale mapping the largest magnitude in embeddings to 127."""
+    peak = float(np.max(np.abs(embeddings)))
+    return 127.0 / peak if peak > 0 else 1.0
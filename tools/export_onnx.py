@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Export a sentence-transformers model to ONNX with INT8 dynamic quantization.
+
+Usage:
+    python3 export_onnx.py [--model MODEL] [--output DIR]
+
+Example:
+    pip3 install "optimum[exporters]" onnxruntime
+    python3 export_onnx.py --output ~/.cache/arxiv/onnx-minilm
+    ARXIV_ONNX_DIR=~/.cache/arxiv/onnx-minilm python3 generate_embeddings.py ~/.cache/arxiv
+
+The output directory holds model.onnx, model-int8.onnx and the tokenizer
+files; pass it to generate_embeddings.py / query_embedding.py with
+--onnx-dir or the ARXIV_ONNX_DIR environment variable.
+"""
+
+import argparse
+from pathlib import Path
+
+from onnx_encoder import FLOAT_MODEL, QUANTIZED_MODEL
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def export(model_name, output):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from optimum.exporters.onnx import main_export
+
+    output = Path(output)
+    print(f"Exporting {model_name} to {output}")
+    main_export(model_name, output=str(output), task="feature-extraction")
+
+    print("Quantizing weights to INT8")
+    quantize_dynamic(str(output / FLOAT_MODEL), str(output / QUANTIZED_MODEL),
+                     weight_type=QuantType.QInt8)
+    print(f"Done! Wrote {output / QUANTIZED_MODEL}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an embedding model to quantized ONNX")
+    parser.add_argument("--model", default=MODEL_NAME,
+                       help=f"Hugging Face model to export (default: {MODEL_NAME})")
+    parser.add_argument("--output", default="onnx-minilm",
+                       help="Output directory (default: onnx-minilm)")
+    args = parser.parse_args()
+    export(args.model, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,57 +4,517 @@ Generate embeddings for arXiv papers using sentence-transformers.
 
 Usage:
     python3 generate_embeddings.py <cache_dir> [--model MODEL] [--limit N] [--batch-size N]
+                                   [--precision {float32,int8,binary}] [--onnx-dir DIR]
+                                   [--workers N] [--pretokenize]
 
 Example:
     python3 generate_embeddings.py ~/.cache/arxiv --limit 1000
 """
 
 import argparse
+import base64
+import functools
+import itertools
+import json
+import os
+import queue
 import sqlite3
-import struct
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from tqdm import tqdm
 
-MODEL_NAME = "all-MiniLM-L6-v2"  # 384 dimensions, fast, good quality
+import query_cache
+from build_index import build_index, embedding_generation, index_exists, update_index
+from embedding_format import (MODEL_NAME, PRECISIONS, calibrate_scale, deserialize_embedding,
+                              serialize_batch, serialize_embedding)
+from onnx_encoder import OnnxEncoder
 
+# Directory written by export_onnx.py; when set, inference runs on ONNX Runtime
+ONNX_DIR = os.environ.get("ARXIV_ONNX_DIR")
 
-def serialize_embedding(embedding):
-    """Serialize numpy array to bytes (little-endian float32)."""
-    return embedding.astype('float32').tobytes()
+# Rows buffered to calibrate a model's int8 scale on its first bulk run. The
+# first batches are the shortest texts, so calibrating on them alone would
+# clip larger components in later rows.
+CALIBRATION_ROWS = 10000
 
+# Characters of title + abstract kept for encoding. The model only reads its
+# first 256 tokens (~1000-1300 characters of English), so anything past this
+# would be tokenized and then thrown away.
+MAX_TEXT_CHARS = 1500
 
-def deserialize_embedding(data):
-    """Deserialize bytes to numpy array."""
-    import numpy as np
-    return np.frombuffer(data, dtype='float32')
+# Batches fetched at a time and sorted by text length before encoding
+SORT_WINDOW = 50
 
+# Papers handed to the multi-process pool per call (one progress line each)
+POOL_CHUNK = 5000
 
-def generate_single_embedding(query, model_name=MODEL_NAME):
-    import numpy as np
-    import sys
-    import os
-    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
-    with open(os.devnull, 'w') as devnull:
-        old_stderr = sys.stderr
-        sys.stderr = devnull
-        model = SentenceTransformer(model_name)
-        sys.stderr = old_stderr
-    embedding = model.encode([query], convert_to_numpy=True)[0]
-    print(','.join(map(str, embedding.astype(np.float32))))
+# Batches buffered between the read, encode and write stages
+PIPELINE_DEPTH = 4
 
+# End-of-stream marker passed between pipeline stages
+_DONE = object()
 
-def generate_embeddings(cache_dir, model_name=MODEL_NAME, limit=None, batch_size=32, query=None):
-    """Generate embeddings for papers in cache."""
-    
-    # If query is provided, generate single embedding
-    if query:
-        generate_single_embedding(query, model_name)
-        return
+# Papers that have a title and abstract but no embedding yet, joined with
+# their stored token ids for :model (t.input_ids is NULL if not pretokenized)
+PENDING_PAPERS = """
+    FROM papers p
+    LEFT JOIN embeddings e ON e.paper_id = p.id
+    LEFT JOIN tokens t ON t.paper_id = p.id AND t.model = :model
+    WHERE e.paper_id IS NULL AND p.title != '' AND p.abstract != ''
+"""
+
+
+def paper_text(title, abstract):
+    """Return the text embedded for a paper."""
+    text = title + ". " + abstract if title and abstract else (title or abstract)
+    return text[:MAX_TEXT_CHARS]
+
+
+def iter_pending(conn, columns, model_name, window_size, limit=None, where=""):
+    """Yield lists of up to window_size pending (p.id, ...) rows, in id order.
+
+    Pages by keyset (p.id > last id) with one short query per window, so no
+    read transaction, and no WAL snapshot, stays open for the whole run and
+    checkpoints can keep the -wal file small. where adds conditions to
+    PENDING_PAPERS; limit caps the total rows.
+    """
+    query = f"SELECT {columns} {PENDING_PAPERS} {where} AND p.id > :last ORDER BY p.id LIMIT :n"
+    last = ""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        n = window_size if remaining is None else min(window_size, remaining)
+        rows = conn.execute(query, {"model": model_name, "last": last, "n": n}).fetchall()
+        if not rows:
+            return
+        # Taken before yielding: callers may reorder the window
+        last = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+        yield rows
+
+
+def iter_batches(windows, batch_size):
+    """Yield lists of (id, title, abstract, ...) rows, batch_size at a time.
+
+    Each window of rows is sorted by text length, so each batch is padded to
+    roughly its own length rather than to the longest abstract nearby. Only
+    one window of rows is held in memory.
+    """
+    for rows in windows:
+        rows.sort(key=lambda p: len(p[1] or '') + len(p[2] or ''))
+        for i in range(0, len(rows), batch_size):
+            yield rows[i:i+batch_size]
+
+
+def configure_connection(conn):
+    """Tune a connection for bulk writes.
+
+    WAL with synchronous=NORMAL only fsyncs at checkpoints, instead of on
+    every commit.
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+
+
+def ensure_schema(conn):
+    """Create or upgrade the embeddings and embedding_meta tables."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            paper_id TEXT PRIMARY KEY,
+            model TEXT,
+            vector BLOB,
+            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            precision TEXT DEFAULT 'float32'
+        )
+    """)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(embeddings)")}
+    if "precision" not in columns:
+        cursor.execute("ALTER TABLE embeddings ADD COLUMN precision TEXT DEFAULT 'float32'")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_meta (
+            model TEXT PRIMARY KEY,
+            scale REAL,
+            dim INTEGER,
+            generation INTEGER DEFAULT 0
+        )
+    """)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(embedding_meta)")}
+    if "generation" not in columns:
+        cursor.execute("ALTER TABLE embedding_meta ADD COLUMN generation INTEGER DEFAULT 0")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tokens (
+            paper_id TEXT,
+            model TEXT,
+            input_ids BLOB,
+            PRIMARY KEY (paper_id, model)
+        )
+    """)
+    conn.commit()
+
+
+def load_scale(conn, model_name):
+    """Return the stored int8 scale for model_name, or None if not calibrated yet."""
+    row = conn.execute("SELECT scale FROM embedding_meta WHERE model = ?", (model_name,)).fetchone()
+    return row[0] if row and row[0] else None
+
+
+def save_scale(conn, model_name, calibration):
+    """Calibrate the int8 scale for model_name on calibration, store it and return it."""
+    scale = calibrate_scale(calibration)
+    conn.execute("""
+        INSERT INTO embedding_meta (model, scale, dim) VALUES (?, ?, ?)
+        ON CONFLICT(model) DO UPDATE SET scale = excluded.scale, dim = excluded.dim
+    """, (model_name, scale, int(calibration.shape[-1])))
+    conn.commit()
+    return scale
+
+
+def bump_generation(conn, model_name):
+    """Record a write to model_name's embeddings; return the new generation.
+
+    Call inside the writing transaction. The search index stores the
+    generation it was built at, which is how the server tells it is stale.
+    """
+    conn.execute("""
+        INSERT INTO embedding_meta (model, generation) VALUES (?, 1)
+        ON CONFLICT(model) DO UPDATE SET generation = generation + 1
+    """, (model_name,))
+    return embedding_generation(conn, model_name)
+
+
+def _inference_dtype():
+    """Pick the reduced precision to run the encoder in, if any.
+
+    FP16 on CUDA; BF16 on CPUs with native AVX512-BF16 support; otherwise
+    the model stays in FP32.
+    """
+    import torch
+    if torch.cuda.is_available():
+        return torch.float16
+    bf16_supported = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    if bf16_supported is not None and bf16_supported():
+        return torch.bfloat16
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model(model_name=MODEL_NAME, onnx_dir=None, reduced_precision=True):
+    """Load the encoder once per process and reuse it.
+
+    With onnx_dir, the exported ONNX model in that directory is used instead
+    of model_name. Otherwise the model runs in FP16/BF16 where supported,
+    unless reduced_precision is false.
+
+    PyTorch and sentence-transformers are imported here rather than at
+    module level, so cached and ONNX paths never load them.
+    """
+    if onnx_dir:
+        return OnnxEncoder(onnx_dir)
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    dtype = _inference_dtype() if reduced_precision else None
+    if dtype is not None:
+        model = model.to(dtype=dtype)
+    return model
+
+
+def start_pool(model, workers):
+    """Start a sentence-transformers multi-process pool.
+
+    Uses one process per CUDA device when GPUs are available, otherwise
+    workers CPU processes with cpu_count // workers threads each (unless
+    OMP_NUM_THREADS is already set).
+    """
+    import torch
+    if torch.cuda.is_available():
+        devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    else:
+        devices = ["cpu"] * workers
+        # Each worker would otherwise start one intra-op thread per core, so
+        # split the cores between them. The spawned workers inherit these.
+        threads = str(max(1, (os.cpu_count() or 1) // workers))
+        os.environ.setdefault("OMP_NUM_THREADS", threads)
+        os.environ.setdefault("MKL_NUM_THREADS", threads)
+    return model.start_multi_process_pool(target_devices=devices)
+
+
+def encode(model, texts, pool=None, batch_size=32):
+    """Encode texts and return a float32 array of shape (len(texts), dim).
+
+    Embeddings are L2-normalized, so stored vectors are unit-norm and cosine
+    similarity between them reduces to a dot product.
+
+    The model may run in FP16/BF16; outputs are cast back to FP32 here so
+    storage and callers never see the reduced precision. With pool, texts
+    are sharded across the pool's worker processes.
+    """
+    if isinstance(model, OnnxEncoder):
+        return model.encode(texts)
+    if pool is not None:
+        # Normalized here: encode_multi_process only takes
+        # normalize_embeddings from sentence-transformers 2.3 on
+        embeddings = np.asarray(model.encode_multi_process(texts, pool, batch_size=batch_size),
+                                dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1)
+    import torch
+    with torch.inference_mode():
+        embeddings = model.encode(texts, show_progress_bar=False, convert_to_tensor=True,
+                                  normalize_embeddings=True)
+    return embeddings.float().cpu().numpy()
+
+
+def encode_tokens(model, token_blobs):
+    """Encode pretokenized texts and return a float32 array like encode().
+
+    token_blobs are int32 input ids as stored by pretokenize(). They are
+    padded into one batch and run through the model's modules directly,
+    skipping the tokenizer.
+    """
+    import torch
+    ids = [np.frombuffer(blob, dtype=np.int32) for blob in token_blobs]
+    input_ids = np.full((len(ids), max(len(x) for x in ids)), model.tokenizer.pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros_like(input_ids)
+    for i, x in enumerate(ids):
+        input_ids[i, :len(x)] = x
+        attention_mask[i, :len(x)] = 1
+
+    features = {
+        "input_ids": torch.from_numpy(input_ids).to(model.device),
+        "attention_mask": torch.from_numpy(attention_mask).to(model.device),
+    }
+    with torch.inference_mode():
+        embeddings = model(features)["sentence_embedding"]
+        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+    return embeddings.float().cpu().numpy()
+
+
+def _max_seq_length(repo, tokenizer):
+    """Return the token limit sentence-transformers truncates repo's inputs to.
+
+    Read from the model's sentence_bert_config.json, so pretokenized ids
+    match what encode() would produce; models without one fall back to the
+    tokenizer's own limit.
+    """
+    if os.path.isdir(repo):
+        path = Path(repo) / "sentence_bert_config.json"
+    else:
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+        try:
+            path = Path(hf_hub_download(repo, "sentence_bert_config.json"))
+        except EntryNotFoundError:
+            path = None
+    if path is not None and path.exists():
+        max_seq_length = json.loads(path.read_text()).get("max_seq_length")
+        if max_seq_length:
+            return max_seq_length
+    return tokenizer.model_max_length
+
+
+def pretokenize(cache_dir, model_name=MODEL_NAME, limit=None, batch_size=1000):
+    """Tokenize papers that still need embeddings and store their input ids.
+
+    Later generate_embeddings runs read the stored ids instead of running
+    the tokenizer again, so an interrupted run does not redo that work.
+    """
+    db_path = Path(cache_dir) / "index.db"
+    if not db_path.exists():
+        print(f"Error: Database not found at {db_path}")
+        sys.exit(1)
+
+    # Only the tokenizer is needed; loading the full model would also cast it
+    # and possibly move it to the GPU
+    from transformers import AutoTokenizer
+    # Bare names like all-MiniLM-L6-v2 live under the sentence-transformers org
+    repo = model_name if "/" in model_name or os.path.isdir(model_name) else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo, use_fast=True)
+    max_length = _max_seq_length(repo, tokenizer)
+
+    conn = sqlite3.connect(str(db_path))
+    configure_connection(conn)
+    ensure_schema(conn)
+
+    processed = 0
+    for batch in iter_pending(conn, "p.id, p.title, p.abstract", model_name, batch_size, limit,
+                              "AND t.paper_id IS NULL"):
+        texts = [paper_text(title, abstract) for _, title, abstract in batch]
+        encoded = tokenizer(texts, padding=False, truncation=True, max_length=max_length)
+        conn.executemany(
+            "INSERT OR REPLACE INTO tokens (paper_id, model, input_ids) VALUES (?, ?, ?)",
+            [(paper_id, model_name, np.asarray(ids, dtype=np.int32).tobytes())
+             for (paper_id, _, _), ids in zip(batch, encoded["input_ids"])],
+        )
+        conn.commit()
+        processed += len(batch)
+        print(f"Tokenized {processed} papers")
+        sys.stdout.flush()
+
+    conn.close()
+    print(f"Done! Stored tokens for {processed} papers.")
+
+
+def _now():
+    """Return the current UTC time in SQLite's datetime('now') format."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _put(q, item, stop):
+    """Put item on q unless stop is set; return False if the pipeline stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """Get the next item from q, or _DONE if the pipeline stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _run_stage(stop, stage, *args):
+    """Run a pipeline stage, stopping the whole pipeline if it fails."""
+    try:
+        return stage(*args)
+    except BaseException:
+        stop.set()
+        raise
+
+
+def _read_stage(read_conn, model_name, limit, batch_size, window, use_tokens, batches, stop):
+    """Fetch pending papers and queue (paper_ids, texts, token_blobs) batches.
+
+    token_blobs is set, and texts is None, when every paper in the batch has
+    stored token ids and use_tokens is true.
+    """
+    windows = iter_pending(read_conn, "p.id, p.title, p.abstract, t.input_ids", model_name,
+                           batch_size * window, limit)
+    for batch in iter_batches(windows, batch_size):
+        paper_ids = [paper_id for paper_id, _, _, _ in batch]
+        token_blobs = [input_ids for _, _, _, input_ids in batch]
+        if use_tokens and all(token_blobs):
+            item = (paper_ids, None, token_blobs)
+        else:
+            # The pending query guarantees title and abstract are non-empty
+            texts = [paper_text(title, abstract) for _, title, abstract, _ in batch]
+            item = (paper_ids, texts, None)
+        if not _put(batches, item, stop):
+            return
+    _put(batches, _DONE, stop)
+
+
+def _iter_queue(q, stop):
+    """Yield items from q until _DONE or the pipeline stops."""
+    while True:
+        item = _get(q, stop)
+        if item is _DONE:
+            return
+        yield item
+
+
+def _calibrate_int8(conn, model_name, encoded, stop):
+    """Return (batches, scale) for storing encoded batches as int8.
+
+    Uses the stored scale if the model has one. Otherwise buffers batches
+    until CALIBRATION_ROWS rows (or the end of the stream), calibrates the
+    scale on all of them and stores it; the returned iterator replays the
+    buffered batches first.
+    """
+    scale = load_scale(conn, model_name)
+    if scale is not None:
+        return encoded, scale
+    buffered = []
+    rows = 0
+    for item in encoded:
+        buffered.append(item)
+        rows += len(item[0])
+        if rows >= CALIBRATION_ROWS:
+            break
+    if not buffered or stop.is_set():
+        return iter(()), None
+    scale = save_scale(conn, model_name, np.vstack([embeddings for _, embeddings in buffered]))
+    return itertools.chain(buffered, encoded), scale
+
+
+def _write_stage(conn, model_name, precision, total_papers, encoded, stop):
+    """Store queued (paper_ids, embeddings) batches; return the number stored.
+
+    conn must be in autocommit mode (isolation_level=None). Each batch is
+    written in its own short transaction, opened only once the batch has
+    arrived, so the write lock is never held while waiting on the encoder
+    and the server and --paper-id runs can write in between. Under WAL with
+    synchronous=NORMAL a commit does not fsync, so small transactions are cheap.
+    """
+    cursor = conn.cursor()
+    processed = 0
+    batches = _iter_queue(encoded, stop)
+    scale = None
+    if precision == "int8":
+        batches, scale = _calibrate_int8(conn, model_name, batches, stop)
+    for paper_ids, embeddings in batches:
+        # Store embeddings, with one timestamp for the whole batch
+        now = _now()
+        rows = [
+            (paper_id, model_name, vector_bytes, now, precision)
+            for paper_id, vector_bytes in zip(paper_ids, serialize_batch(embeddings, precision, scale))
+        ]
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany("""
+            INSERT OR REPLACE INTO embeddings (paper_id, model, vector, created, precision)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        # Stored token ids are only needed until the paper is embedded
+        cursor.executemany("DELETE FROM tokens WHERE paper_id = ? AND model = ?",
+                           [(paper_id, model_name) for paper_id in paper_ids])
+        bump_generation(conn, model_name)
+        cursor.execute("COMMIT")
+        
+        processed += len(paper_ids)
+        
+        # Output progress in format expected by SSE handler
+        percent = (processed / total_papers) * 100
+        print(f"Processed {processed}/{total_papers} papers ({percent:.1f}% complete)")
+        sys.stdout.flush()
     
+    return processed
+
+
+def generate_single_embedding(query, model_name=MODEL_NAME, onnx_dir=None, cache_dir=None):
+    """Print the embedding for query, reusing the disk cache under cache_dir."""
+    backend = query_cache.backend(onnx_dir)
+    embedding = query_cache.load(cache_dir, query, model_name, backend) if cache_dir else None
+    if embedding is None:
+        os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+        with open(os.devnull, 'w') as devnull:
+            old_stderr = sys.stderr
+            sys.stderr = devnull
+            # FP32 like query_embedding.py, so both share cache entries
+            model = _get_model(model_name, onnx_dir, reduced_precision=False)
+            sys.stderr = old_stderr
+        embedding = encode(model, [query])[0]
+        if cache_dir:
+            query_cache.store(cache_dir, query, model_name, backend, embedding)
+    print(base64.b64encode(embedding.astype('<f4').tobytes()).decode('ascii'))
+
+
+def generate_embeddings(cache_dir, model_name=MODEL_NAME, limit=None, batch_size=32,
+                        precision="float32", onnx_dir=None, workers=1):
+    """Generate embeddings for papers in cache."""
     cache_path = Path(cache_dir)
     db_path = cache_path / "index.db"
     
@@ -63,98 +523,88 @@ def generate_embeddings(cache_dir, model_name=MODEL_NAME, limit=None, batch_size
         sys.exit(1)
     
     print(f"Loading model: {model_name}")
-    model = SentenceTransformer(model_name)
+    model = _get_model(model_name, onnx_dir)
     print(f"Model loaded. Embedding dimension: {model.get_sentence_embedding_dimension()}")
     
-    # Connect to database
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    # Separate connections for the read and write pipeline stages. Under WAL
+    # the paged reads don't block the writer's transactions; the writer
+    # manages its own transactions in autocommit mode.
+    read_conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    write_conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+    configure_connection(read_conn)
+    configure_connection(write_conn)
     
-    # If query is provided, generate single embedding
-    if query:
-        generate_single_embedding(query, model_name)
-        return
+    ensure_schema(write_conn)
     
-    # Check if embeddings table exists
-    cursor.execute("""
-        SELECT name FROM sqlite_master 
-        WHERE type='table' AND name='embeddings'
-    """)
-    if not cursor.fetchone():
-        print("Creating embeddings table...")
-        cursor.execute("""
-            CREATE TABLE embeddings (
-                paper_id TEXT PRIMARY KEY,
-                model TEXT,
-                vector BLOB,
-                created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-    
-    # Get papers without embeddings
-    query = """
-        SELECT id, title, abstract 
-        FROM papers 
-        WHERE title != '' AND abstract != ''
-        AND id NOT IN (SELECT paper_id FROM embeddings)
-    """
+    # Count papers without embeddings
+    params = {"model": model_name}
+    total_papers = read_conn.execute("SELECT COUNT(*) " + PENDING_PAPERS, params).fetchone()[0]
     if limit:
-        query += f" LIMIT {limit}"
-    
-    cursor.execute(query)
-    papers = cursor.fetchall()
+        total_papers = min(total_papers, limit)
     
-    if not papers:
+    if not total_papers:
         print("No papers need embeddings.")
         return
     
-    total_papers = len(papers)
     print(f"Found {total_papers} papers to process")
     sys.stdout.flush()
     
-    # Process in batches
-    processed = 0
-    for i in range(0, total_papers, batch_size):
-        batch = papers[i:i+batch_size]
-        
-        # Prepare texts (title + abstract)
-        texts = []
-        paper_ids = []
-        for paper_id, title, abstract in batch:
-            # Combine title and abstract
-            text = f"{title}. {abstract}" if title and abstract else (title or abstract)
-            texts.append(text)
-            paper_ids.append(paper_id)
-        
-        # Generate embeddings
-        embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-        
-        # Store embeddings
-        for paper_id, embedding in zip(paper_ids, embeddings):
-            vector_bytes = serialize_embedding(embedding)
-            cursor.execute("""
-                INSERT OR REPLACE INTO embeddings (paper_id, model, vector, created)
-                VALUES (?, ?, ?, datetime('now'))
-            """, (paper_id, model_name, vector_bytes))
-        
-        processed += len(batch)
-        
-        # Output progress in format expected by SSE handler
-        percent = (processed / total_papers) * 100
-        print(f"Processed {processed}/{total_papers} papers ({percent:.1f}% complete)")
-        sys.stdout.flush()
-        
-        if processed % 100 == 0:
-            conn.commit()
+    # With several workers, hand the pool large chunks; each worker batches
+    # and length-sorts its share internally
+    pool = None
+    step = batch_size
+    if workers > 1 and not isinstance(model, OnnxEncoder):
+        pool = start_pool(model, workers)
+        step = POOL_CHUNK
+    use_tokens = pool is None and not isinstance(model, OnnxEncoder)
     
-    conn.commit()
-    conn.close()
+    try:
+        # Reading and writing run on their own threads so the encoder, which
+        # releases the GIL while it computes, is not idle during SQLite work
+        stop = threading.Event()
+        batches = queue.Queue(maxsize=PIPELINE_DEPTH)
+        encoded = queue.Queue(maxsize=PIPELINE_DEPTH)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            reader = executor.submit(_run_stage, stop, _read_stage, read_conn, model_name, limit,
+                                     step, 1 if pool else SORT_WINDOW, use_tokens, batches, stop)
+            writer = executor.submit(_run_stage, stop, _write_stage, write_conn, model_name, precision,
+                                     total_papers, encoded, stop)
+            try:
+                while True:
+                    item = _get(batches, stop)
+                    if item is _DONE:
+                        break
+                    paper_ids, texts, token_blobs = item
+                    if token_blobs:
+                        embeddings = encode_tokens(model, token_blobs)
+                    else:
+                        embeddings = encode(model, texts, pool, batch_size)
+                    if not _put(encoded, (paper_ids, embeddings), stop):
+                        break
+                _put(encoded, _DONE, stop)
+            except BaseException:
+                stop.set()
+                raise
+            reader.result()
+            processed = writer.result()
+    finally:
+        # Always shut the worker processes down, or they outlive a failed run
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+        read_conn.close()
+        write_conn.close()
+    
+    # Keep an existing search index in step with the table
+    if index_exists(cache_dir):
+        print("Refreshing embedding index...")
+        sys.stdout.flush()
+        build_index(cache_dir, model_name)
     
     print(f"Done! Generated embeddings for {processed} papers.")
 
 
-def generate_paper_embedding(cache_dir, paper_id, model_name=MODEL_NAME):
+def generate_paper_embedding(cache_dir, paper_id, model_name=MODEL_NAME, precision="float32",
+                             onnx_dir=None):
     """Generate embedding for a single paper by ID."""
     cache_path = Path(cache_dir)
     db_path = cache_path / "index.db"
@@ -164,6 +614,7 @@ def generate_paper_embedding(cache_dir, paper_id, model_name=MODEL_NAME):
         sys.exit(1)
     
     conn = sqlite3.connect(str(db_path))
+    configure_connection(conn)
     cursor = conn.cursor()
     
     cursor.execute("SELECT id, title, abstract FROM papers WHERE id = ?", (paper_id,))
@@ -181,30 +632,32 @@ def generate_paper_embedding(cache_dir, paper_id, model_name=MODEL_NAME):
         conn.close()
         sys.exit(1)
     
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='embeddings'")
-    if not cursor.fetchone():
-        cursor.execute("""
-            CREATE TABLE embeddings (
-                paper_id TEXT PRIMARY KEY,
-                model TEXT,
-                vector BLOB,
-                created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+    ensure_schema(conn)
     
-    model = SentenceTransformer(model_name)
-    text = f"{title}. {abstract}" if title and abstract else (title or abstract)
-    embedding = model.encode([text], convert_to_numpy=True)[0]
-    vector_bytes = serialize_embedding(embedding)
+    model = _get_model(model_name, onnx_dir)
+    text = paper_text(title, abstract)
+    embedding = encode(model, [text])[0]
+    scale = load_scale(conn, model_name) if precision == "int8" else None
+    if precision == "int8" and scale is None:
+        # One vector is no basis for a scale; store float32 until a bulk
+        # run has calibrated one
+        print(f"Note: no int8 scale for {model_name} yet, storing float32", file=sys.stderr)
+        precision = "float32"
+    vector_bytes = serialize_embedding(embedding, precision, scale)
     
     cursor.execute("""
-        INSERT OR REPLACE INTO embeddings (paper_id, model, vector, created)
-        VALUES (?, ?, ?, datetime('now'))
-    """, (paper_id, model_name, vector_bytes))
+        INSERT OR REPLACE INTO embeddings (paper_id, model, vector, created, precision)
+        VALUES (?, ?, ?, ?, ?)
+    """, (paper_id, model_name, vector_bytes, _now(), precision))
+    cursor.execute("DELETE FROM tokens WHERE paper_id = ? AND model = ?", (paper_id, model_name))
+    generation = bump_generation(conn, model_name)
     
     conn.commit()
     conn.close()
+    
+    # Patch the row into an existing search index so it stays current
+    update_index(cache_dir, model_name, paper_id,
+                 deserialize_embedding(vector_bytes, precision, scale), generation)
     print(f"OK: Generated embedding for {paper_id}")
 
 
@@ -218,22 +671,38 @@ def main():
     parser.add_argument("--batch-size", type=int, default=32,
                        help="Batch size for embedding generation (default: 32)")
     parser.add_argument("--query", type=str, default=None,
-                       help="Generate embedding for a query string (prints comma-separated floats)")
+                       help="Generate embedding for a query string (prints base64 little-endian float32)")
     parser.add_argument("--paper-id", type=str, default=None,
                        help="Generate embedding for a single paper by ID")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float32",
+                       help="Storage precision for stored vectors (default: float32)")
+    parser.add_argument("--onnx-dir", default=ONNX_DIR,
+                       help="Run inference on the ONNX model exported to DIR by export_onnx.py "
+                            "(default: $ARXIV_ONNX_DIR)")
+    parser.add_argument("--pretokenize", action="store_true",
+                       help="Only tokenize papers without embeddings and store the token ids")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Encoding processes; >1 uses a multi-process pool, one per GPU "
+                            "if CUDA is available (default: 1)")
     
     args = parser.parse_args()
     
     if args.query:
-        generate_single_embedding(args.query, args.model)
+        generate_single_embedding(args.query, args.model, args.onnx_dir, args.cache_dir)
+    elif args.pretokenize:
+        pretokenize(args.cache_dir, args.model, args.limit)
     elif args.paper_id:
-        generate_paper_embedding(args.cache_dir, args.paper_id, args.model)
+        generate_paper_embedding(args.cache_dir, args.paper_id, args.model, args.precision,
+                                 args.onnx_dir)
     else:
         generate_embeddings(
             args.cache_dir,
             model_name=args.model,
             limit=args.limit,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            precision=args.precision,
+            onnx_dir=args.onnx_dir,
+            workers=args.workers
         )
 
 
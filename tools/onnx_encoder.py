@@ -0,0 +1,64 @@
+"""
+ONNX Runtime replacement for SentenceTransformer inference.
+
+Loads a model directory written by export_onnx.py and reproduces the
+all-MiniLM-L6-v2 pipeline (transformer -> mean pooling -> L2 normalize)
+with onnxruntime and NumPy, so no PyTorch is needed at inference time.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+QUANTIZED_MODEL = "model-int8.onnx"
+FLOAT_MODEL = "model.onnx"
+
+# Per-token hidden-state outputs, by name: plain transformer exports use the
+# first, sentence-transformers exports from optimum the second
+HIDDEN_STATE_OUTPUTS = ("last_hidden_state", "token_embeddings")
+
+
+def model_path(model_dir):
+    """Return the ONNX file used from model_dir: the INT8 export if present."""
+    model_dir = Path(model_dir)
+    path = model_dir / QUANTIZED_MODEL
+    return path if path.exists() else model_dir / FLOAT_MODEL
+
+
+class OnnxEncoder:
+    """Drop-in for the parts of SentenceTransformer the tools use."""
+
+    def __init__(self, model_dir, max_length=256):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path(model_dir)), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        outputs = {o.name: o for o in self.session.get_outputs()}
+        names = [name for name in HIDDEN_STATE_OUTPUTS if name in outputs]
+        if not names:
+            raise ValueError(f"{model_path(model_dir)} has no {' or '.join(HIDDEN_STATE_OUTPUTS)} "
+                             f"output (outputs: {', '.join(outputs)})")
+        self.output = outputs[names[0]]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir), use_fast=True)
+        self.max_length = max_length
+
+    def get_sentence_embedding_dimension(self):
+        return self.output.shape[-1]
+
+    def encode(self, texts, **kwargs):
+        """Encode texts to unit-norm float32 vectors of shape (len(texts), dim).
+
+        SentenceTransformer.encode keyword arguments are accepted and ignored.
+        """
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_length, return_tensors="np")
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        hidden = self.session.run([self.output.name], feeds)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return (pooled / norms).astype(np.float32)
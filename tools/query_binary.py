@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Search binary-quantized embeddings for a query.
+
+Candidates are retrieved by Hamming distance between the packed sign bits of
+the query and of each stored vector, then the top candidates are rescored with
+the full float32 query embedding.
+
+Usage:
+    python3 query_binary.py <cache_dir> "query text" [--limit N] [--rerank N]
+
+Output is one "paper_id<TAB>score" line per result, best first.
+
+Example:
+    python3 generate_embeddings.py ~/.cache/arxiv --precision binary
+    python3 query_binary.py ~/.cache/arxiv "diffusion models for audio"
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from embedding_format import MODEL_NAME, pack_signs
+from generate_embeddings import ONNX_DIR, _get_model, encode
+
+# Number of set bits in each byte value.
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def load_corpus(db_path, model_name):
+    """Load all binary vectors for model_name as an (N, dim/8) uint8 matrix."""
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute(
+        "SELECT paper_id, vector FROM embeddings WHERE precision = 'binary' AND model = ?",
+        (model_name,),
+    ).fetchall()
+    conn.close()
+
+    if not rows:
+        return [], np.empty((0, 0), dtype=np.uint8)
+
+    paper_ids = [paper_id for paper_id, _ in rows]
+    corpus = np.frombuffer(b"".join(vector for _, vector in rows), dtype=np.uint8)
+    return paper_ids, corpus.reshape(len(rows), -1)
+
+
+def hamming_distances(query_packed, corpus):
+    """Return the Hamming distance from query_packed to every row of corpus."""
+    return POPCOUNT[np.bitwise_xor(corpus, query_packed)].sum(axis=1)
+
+
+def search(query_embedding, paper_ids, corpus, limit=20, rerank=100):
+    """Return (paper_id, score) pairs for the best matches, best first."""
+    query_packed = pack_signs(query_embedding)
+    distances = hamming_distances(query_packed, corpus)
+
+    k = max(1, min(rerank, len(paper_ids)))
+    candidates = np.argpartition(distances, k - 1)[:k]
+
+    # Rescore candidates with the unit-norm float query against the +1/-1 corpus vectors
+    signs = np.unpackbits(corpus[candidates], axis=1).astype(np.float32) * 2 - 1
+    scores = signs[:, :query_embedding.shape[0]] @ query_embedding.astype(np.float32)
+    order = np.argsort(-scores)[:limit]
+    return [(paper_ids[candidates[i]], float(scores[i])) for i in order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search binary-quantized embeddings")
+    parser.add_argument("cache_dir", help="Path to arXiv cache directory")
+    parser.add_argument("query", help="Query text")
+    parser.add_argument("--model", default=MODEL_NAME,
+                       help=f"Embedding model to use (default: {MODEL_NAME})")
+    parser.add_argument("--limit", type=int, default=20,
+                       help="Number of results to print (default: 20)")
+    parser.add_argument("--rerank", type=int, default=100,
+                       help="Number of Hamming candidates to rescore (default: 100)")
+    parser.add_argument("--onnx-dir", default=ONNX_DIR,
+                       help="Run inference on the ONNX model exported to DIR (default: $ARXIV_ONNX_DIR)")
+    args = parser.parse_args()
+
+    db_path = Path(args.cache_dir) / "index.db"
+    if not db_path.exists():
+        print(f"ERROR: Database not found at {db_path}")
+        sys.exit(1)
+
+    paper_ids, corpus = load_corpus(db_path, args.model)
+    if not paper_ids:
+        print("ERROR: No binary embeddings found. Run generate_embeddings.py --precision binary")
+        sys.exit(1)
+
+    model = _get_model(args.model, args.onnx_dir)
+    query_embedding = encode(model, [args.query])[0]
+
+    for paper_id, score in search(query_embedding, paper_ids, corpus, args.limit, args.rerank):
+        print(f"{paper_id}\t{score:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Disk cache of query embeddings.
+
+Each query's embedding is stored as raw little-endian float32 in
+<cache_dir>/query_cache/<key>.f32, keyed by a BLAKE2b hash of the model name,
+the inference backend (see backend()) and the query text. Only NumPy is
+needed, so a hit never imports PyTorch or loads the model.
+
+The cache holds at most MAX_ENTRIES embeddings; hits refresh an entry's
+mtime and the least recently used entries are evicted first.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+from onnx_encoder import model_path
+
+CACHE_SUBDIR = "query_cache"
+
+# Entries kept before the least recently used are evicted (~1.5 KB each at 384 dims)
+MAX_ENTRIES = 10000
+
+
+def backend(onnx_dir=None):
+    """Name the backend and precision queries are encoded with.
+
+    ONNX Runtime with the INT8 or FP32 export when onnx_dir is set,
+    otherwise PyTorch in FP32. Computed without importing either.
+    """
+    if onnx_dir:
+        return f"onnx:{model_path(onnx_dir).resolve()}"
+    return "torch:float32"
+
+
+def _path(cache_dir, query, model_name, backend):
+    key = hashlib.blake2b(f"{model_name}\0{backend}\0{query}".encode(), digest_size=16).hexdigest()
+    return Path(cache_dir) / CACHE_SUBDIR / f"{key}.f32"
+
+
+def load(cache_dir, query, model_name, backend):
+    """Return the cached embedding for query, or None."""
+    path = _path(cache_dir, query, model_name, backend)
+    try:
+        embedding = np.fromfile(path, dtype='<f4')
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return embedding
+
+
+def store(cache_dir, query, model_name, backend, embedding):
+    """Cache the embedding for query, evicting old entries past MAX_ENTRIES."""
+    path = _path(cache_dir, query, model_name, backend)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    embedding.astype('<f4').tofile(tmp)
+    os.replace(tmp, path)
+    _evict(path.parent)
+
+
+def _evict(directory):
+    """Delete the least recently used entries once there are more than MAX_ENTRIES."""
+    entries = [e for e in os.scandir(directory) if e.name.endswith(".f32")]
+    if len(entries) <= MAX_ENTRIES:
+        return
+    # Trim to 90% so eviction does not run on every store once full
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - MAX_ENTRIES * 9 // 10]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
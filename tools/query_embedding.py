@@ -2,39 +2,119 @@
 """
 Generate embedding for a single query.
 Used by Go server for semantic search queries.
+
+Usage:
+    python3 query_embedding.py "query text"
+    QUERY="query text" python3 query_embedding.py
+    python3 query_embedding.py --server   # newline-delimited queries on stdin
+
+Each embedding is printed as one line: base64 of the little-endian float32
+vector (384 dims -> 2048 characters).
+
+With --cache-dir (default: $ARXIV_CACHE), embeddings are cached on disk and
+the model is only loaded on the first cache miss.
 """
 
-import sys
-import json
+import argparse
+import base64
+import functools
 import os
+import sys
+
+import query_cache
 
-# Add tools directory to path
-sys.path.append('/home/ubuntu/arxiv/tools')
+MODEL_NAME = "all-MiniLM-L6-v2"
 
-try:
+
+def format_embedding(embedding):
+    """Format an embedding as base64 of its little-endian float32 bytes."""
+    return base64.b64encode(embedding.astype('<f4').tobytes()).decode('ascii')
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model(model_name, onnx_dir=None):
+    """Load the encoder on first use and reuse it."""
+    if onnx_dir:
+        from onnx_encoder import OnnxEncoder
+        return OnnxEncoder(onnx_dir)
+    import torch
     from sentence_transformers import SentenceTransformer
-    import numpy as np
-    
-    # Load model (cached globally)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    
-    # Get query from environment variable or command line
-    query = os.environ.get('QUERY') or (sys.argv[1] if len(sys.argv) > 1 else '')
-    
-    if not query:
+    torch.set_num_threads(os.cpu_count() or 1)
+    return SentenceTransformer(model_name)
+
+
+def encode(model, query):
+    # Unit-norm like the stored paper vectors, so cosine similarity is a dot product
+    return model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+
+def embed(query, args):
+    """Return the embedding for query, from the disk cache when possible."""
+    if args.cache_dir:
+        cached = query_cache.load(args.cache_dir, query, args.model, query_cache.backend(args.onnx_dir))
+        if cached is not None:
+            return cached
+    embedding = encode(_get_model(args.model, args.onnx_dir), query)
+    if args.cache_dir:
+        query_cache.store(args.cache_dir, query, args.model, query_cache.backend(args.onnx_dir),
+                          embedding)
+    return embedding
+
+
+def serve(args):
+    """Read one query per line on stdin and answer with one embedding per line.
+
+    The model is loaded once, so the Go server can keep a single worker
+    process alive instead of paying the model load for every query.
+    """
+    for line in sys.stdin:
+        query = line.strip()
+        if not query:
+            print("ERROR: No query provided")
+        else:
+            try:
+                print(format_embedding(embed(query, args)))
+            except Exception as e:
+                # Replies are one line each; multi-line messages (e.g. from
+                # huggingface_hub) would desynchronize the Go side
+                print("ERROR: " + " ".join(str(e).split()))
+        sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate query embeddings")
+    parser.add_argument("query", nargs="?", default=None,
+                        help="Query text (defaults to $QUERY)")
+    parser.add_argument("--model", default=MODEL_NAME,
+                        help=f"Embedding model to use (default: {MODEL_NAME})")
+    parser.add_argument("--onnx-dir", default=os.environ.get("ARXIV_ONNX_DIR"),
+                        help="Run inference on the ONNX model exported to DIR by export_onnx.py "
+                             "(default: $ARXIV_ONNX_DIR)")
+    parser.add_argument("--cache-dir", default=os.environ.get("ARXIV_CACHE"),
+                        help="arXiv cache directory to keep the query cache in (default: $ARXIV_CACHE)")
+    parser.add_argument("--server", action="store_true",
+                        help="Read newline-delimited queries on stdin until EOF")
+    args = parser.parse_args()
+
+    query = os.environ.get('QUERY') or args.query
+    if not args.server and not query:
         print("ERROR: No query provided", file=sys.stderr)
         sys.exit(1)
-    
-    # Generate embedding
-    embedding = model.encode([query], convert_to_numpy=True)[0]
-    
-    # Output as comma-separated values for easy parsing
-    print(','.join(map(str, embedding.astype(np.float32))))
-    
-except ImportError as e:
-    print(f"ERROR: Missing dependency - {e}", file=sys.stderr)
-    print("Please install with: pip install sentence-transformers numpy", file=sys.stderr)
-    sys.exit(1)
-except Exception as e:
-    print(f"ERROR: {e}", file=sys.stderr)
-    sys.exit(1)
\ No newline at end of file
+
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    if args.server:
+        serve(args)
+    else:
+        print(format_embedding(embed(query, args)))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ImportError as e:
+        print(f"ERROR: Missing dependency - {e}", file=sys.stderr)
+        print("Please install with: pip install sentence-transformers numpy", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)